@@ -25,6 +25,7 @@ class PluginInterface(ABC):
         for obj in objs:
             for attr, value in self.config.items():
                 obj[attr] = value
+        utility.invalidate_attr_index()
 
     def configure_settings(self):
         """Set config settings on the geo_node_modifier."""
@@ -30,15 +30,13 @@ class Scene(object):
         self.job_description = job_description
         self.catalog = catalog
 
-        # Write dicts to scene as string of bytes
-        catalog_bytes = str(pickle.dumps(catalog), encoding="latin1")
-        bpy.data.scenes["Scene"]["catalog"] = catalog_bytes
-
-        job_bytes = str(
-            pickle.dumps(job_description),
-            encoding="latin1",
+        # Write dicts to scene as raw bytes
+        bpy.data.scenes["Scene"]["catalog"] = pickle.dumps(
+            catalog, protocol=pickle.HIGHEST_PROTOCOL
+        )
+        bpy.data.scenes["Scene"]["job_description"] = pickle.dumps(
+            job_description, protocol=pickle.HIGHEST_PROTOCOL
         )
-        bpy.data.scenes["Scene"]["job_description"] = job_bytes
 
         self.output_path = Path(bpy.context.scene.render.filepath)
         self.configure_logging()
@@ -54,8 +54,7 @@ def postprocess_functions(img, file):
             values, index = np.unique(img_mm.reshape(-1, img_mm.shape[2]), axis=0, return_inverse=True)
 
             # Hash the unique values to get the instance id
-            vectorized_hash = np.vectorize(utility.hash_vector, signature='(n)->()')
-            instance_id = vectorized_hash(values)
+            instance_id = utility.hash_vectors(values)
 
             # Create instance segmentation mask
             img_mask = instance_id[index]
@@ -20,6 +20,7 @@ class Camera(SensorInterface):
             if obj.get().type == "CAMERA":
                 cam = obj.get()
         cam["name"] = self.config["name"]
+        utility.invalidate_attr_index()
         if "depth_of_field" in self.config:
             cam.data.dof.use_dof = True
             cam.data.dof.aperture_fstop = self.config["depth_of_field"]["aperture"]
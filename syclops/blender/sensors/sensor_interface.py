@@ -33,6 +33,7 @@ class SensorInterface(ABC):
         for obj in objs:
             for attr, value in self.config.items():
                 obj[attr] = value
+        utility.invalidate_attr_index()
 
     def setup_tf(self):
         """Check if plugin has a frame_id and if so, add relationship."""
@@ -28,6 +28,7 @@ class Transformations(object):
             tf_node = self.create_transformation_empty(tf_name)
             for attr, param_value in tf_params.items():
                 tf_node[attr] = param_value
+            utility.invalidate_attr_index()
             if parent:
                 tf_node.parent = parent
             children = tf_params.get("children")
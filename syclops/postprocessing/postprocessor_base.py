@@ -4,7 +4,7 @@ from pathlib import Path
 from typing import Union
 
 import ruamel.yaml as yaml
-from filelock import FileLock, Timeout
+from syclops import utility
 
 
 class PostprocessorBase(ABC):
@@ -95,9 +95,8 @@ class PostprocessorBase(ABC):
     def _find_metadata_yaml(self):
         """Function that finds the metadata.yaml files of the source metadata files."""
         for root, dirs, files in os.walk(self.config["parent_dir"]):
-            files_filtered = [
-                f for f in files if "metadata.yaml" in f and ".lock" not in f
-            ]
+            # Skips lock files and temporary files of atomic writes
+            files_filtered = [f for f in files if f.endswith("metadata.yaml")]
             for file in files_filtered:
                 metadata_file_path = os.path.join(root, file)
                 metadata = self._safe_read(metadata_file_path)
@@ -122,38 +121,36 @@ class PostprocessorBase(ABC):
             metadata (dict): Dictionary to write
 
         Raises:
-            TimeoutError: If the filelock could not be acquired within 5 seconds.
+            TimeoutError: If utility.file_lock could not lock the .lock file within 5 seconds.
         """
         metadata_file_path = str(
             Path(self.output_folder) / f'{self.config["id"]}_metadata.yaml'
         )
-        try:
-            lock = FileLock(f"{metadata_file_path}.lock", timeout=5)
-            with lock.acquire():
-                with open(metadata_file_path, "w") as f:
-                    yaml.dump(metadata, f)
-        except Timeout:
-            error_string = f"Could not acquire filelock for {metadata_file_path}"
-            raise TimeoutError(error_string)
+        with utility.file_lock(f"{metadata_file_path}.lock", timeout=5):
+            # Replace the file atomically, readers might not hold the lock
+            tmp_file_path = f"{metadata_file_path}.tmp"
+            with open(tmp_file_path, "w") as f:
+                yaml.dump(metadata, f)
+            utility.replace_file(tmp_file_path, metadata_file_path)
 
     def _safe_read(self, metadata_file_path: str):
-        """Read a yaml file with locking in order to avoid corrupting the file.
+        """Read a metadata yaml file.
+
+        Metadata files are replaced atomically by their writers, so no lock is
+        needed and the complete previous or new version is read. This only
+        holds for the final files, never for the temporary files of a write.
 
         Args:
             metadata_file_path (str): Path to the metadata file
 
         Raises:
-            TimeoutError: If the filelock could not be acquired within 5 seconds.
+            ValueError: If the path is not a metadata file, e.g. a temporary file.
         """
-        try:
-            lock = FileLock(f"{metadata_file_path}.lock", timeout=5)
-            with lock.acquire():
-                with open(metadata_file_path, "r") as f:
-                    metadata = yaml.safe_load(f)
-            return metadata
-        except Timeout:
-            error_string = f"Could not acquire filelock for {metadata_file_path}"
-            raise TimeoutError(error_string)
+        if not metadata_file_path.endswith("metadata.yaml"):
+            raise ValueError(f"Not a metadata file: {metadata_file_path}")
+        with open(metadata_file_path, "r") as f:
+            metadata = yaml.safe_load(f)
+        return metadata
 
     def _update_processed_step_dict(self, step_id: int):
         """Functino that updates the processed_steps dict if a step is finished."""
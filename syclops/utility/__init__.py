@@ -14,7 +14,7 @@ if 'bpy' in sys.modules:
                                 apply_transform, clear_scene, configure_render,
                                 convex_decomposition, create_clumps,
                                 create_collection, decimate_mesh, duplicate_object,
-                                filter_objects, get_job_conf, load_from_blend,
+                                filter_objects, get_job_conf, invalidate_attr_index, load_from_blend,
                                 load_image, load_img_as_array, merge_objects,
                                 refresh_modifiers, render_visibility,
                                 resize_textures, set_active_collection, set_seeds,
@@ -22,10 +22,12 @@ if 'bpy' in sys.modules:
 from .sampling_utils import (sample_linear,
                             sample_normal, sample_random_selection,
                             sample_selection_asset, sample_selection_folder,
-                            sample_step, sample_uniform, sample_wildcard, apply_sampling)
+                            sample_step, sample_uniform, sample_wildcard, apply_sampling,
+                            interpolate_img)
 
 from .general_utils import (AtomicYAMLWriter, create_folder,
-                            find_class_id_mapping,get_site_packages_path, get_module_path, hash_vector)
+                            find_class_id_mapping,get_site_packages_path, get_module_path, hash_vector, hash_vectors,
+                            load_yaml, dump_yaml, replace_file, scan_tree, file_lock)
 from .postprocessing_utils import (crawl_output_meta, filter_type, create_module_instances_pp)
 
 from .setup_utils import (download_file, extract_zip, extract_tar, install_blender, get_or_create_install_folder)
@@ -1,8 +1,9 @@
 import logging
+import numbers
 import pickle
 import uuid
 from pathlib import Path
-from typing import Union, List
+from typing import Dict, Hashable, List, Union
 
 import bmesh
 import bpy
@@ -12,6 +13,18 @@ from mathutils import Matrix
 from . import sampling_utils as su
 
 
+def _compose(location=None, rotation=None, scale=None) -> Matrix:
+    # Build translation @ rotation @ scale in NumPy and wrap the result once
+    matrix = np.identity(4)
+    if rotation is not None:
+        matrix[:3, :3] = rotation
+    if scale is not None:
+        matrix[:3, :3] *= np.asarray(scale)[None, :]
+    if location is not None:
+        matrix[:3, 3] = location
+    return Matrix(matrix)
+
+
 def apply_transform(
     obj: bpy.types.Object,
     use_location: bool = False,
@@ -27,29 +40,39 @@ def apply_transform(
         use_scale: Whether to apply the scale transformation.
     """
 
+    # Nothing to apply, the final transformation is the identity.
+    if not (use_location or use_rotation or use_scale):
+        obj.matrix_basis = Matrix()
+        return
+
     # Decompose the object matrix basis into its components.
     loc, _, scale = obj.matrix_basis.decompose()
 
-    # Create identity matrix
-    identity = Matrix()
-
-    # Determine matrices based on flags
-    translation_matrix = Matrix.Translation(loc) if use_location else identity
-    rotation_matrix = (
-        obj.matrix_basis.to_3x3().normalized().to_4x4() if use_rotation else identity
+    # Rotation part of the basis with normalized axes
+    rotation = None
+    if use_rotation:
+        rotation = np.array(obj.matrix_basis.to_3x3())
+        axis_lengths = np.linalg.norm(rotation, axis=0)
+        rotation /= np.where(axis_lengths == 0, 1, axis_lengths)
+
+    # Compute the final transformation matrix from the requested components.
+    final_matrix = _compose(
+        loc if use_location else None,
+        rotation,
+        scale if use_scale else None,
     )
-    scaling_matrix = Matrix.Diagonal(scale).to_4x4() if use_scale else identity
-
-    # Compute the final transformation matrix.
-    final_matrix = translation_matrix @ rotation_matrix @ scaling_matrix
 
     # Apply the transformation to the object's data if applicable.
     if hasattr(obj.data, "transform"):
         obj.data.transform(final_matrix)
 
-    # Apply the transformation to all child objects.
-    for child in obj.children:
-        child.matrix_local = final_matrix @ child.matrix_local
+    # Apply the transformation to all child objects in a single batched multiply.
+    children = obj.children
+    if children:
+        local_matrices = np.array([child.matrix_local for child in children])
+        new_local_matrices = np.array(final_matrix) @ local_matrices
+        for child, matrix_local in zip(children, new_local_matrices):
+            child.matrix_local = Matrix(matrix_local)
 
     # Update the object's own transformation.
     obj.matrix_basis = final_matrix
@@ -107,14 +130,37 @@ def set_seeds(seeds: dict) -> None:
     bpy.context.scene.cycles.seed = seeds["cycles"]
 
 
+# Unpickled scene properties: {property name: (pickled bytes, value)}
+_SCENE_PROP_CACHE: Dict[str, tuple] = {}
+
+
+def _load_scene_prop(name: str):
+    """Unpickle a scene property, reusing the last result if it is unchanged.
+
+    Args:
+        name (str): Name of the scene property.
+
+    Returns:
+        The unpickled value. It is shared between calls and must not be modified.
+    """
+    prop_bytes = bpy.data.scenes["Scene"][name]
+    # Scenes written by older versions store the pickle as latin1 string
+    if isinstance(prop_bytes, str):
+        prop_bytes = bytes(prop_bytes, "latin1")
+    cached = _SCENE_PROP_CACHE.get(name)
+    if cached is None or cached[0] != prop_bytes:
+        cached = (prop_bytes, pickle.loads(prop_bytes))
+        _SCENE_PROP_CACHE[name] = cached
+    return cached[1]
+
+
 def get_job_conf() -> dict:
     """Get the job configuration from the scene.
 
     Returns:
         dict: Job configuration.
     """
-    job_string = bpy.data.scenes["Scene"]["job_description"]
-    return pickle.loads(bytes(job_string, "latin1"))
+    return _load_scene_prop("job_description")
 
 
 def append_output_path(path: Union[str, Path], set_blend_path: bool = True) -> Path:
@@ -209,9 +255,60 @@ def set_active_collection(collection: bpy.types.Collection):
     bpy.context.view_layer.active_layer_collection = layer_collection
 
 
+# Inverted index of custom attributes:
+# {attribute: (number of objects when built, {value: [object names]})}
+_ATTR_INDEX: Dict[str, tuple] = {}
+
+
+def invalidate_attr_index() -> None:
+    """Drop the attribute index used by filter_objects.
+
+    Call this after changing custom attributes of existing objects, since
+    such changes are not always followed by a depsgraph update.
+    """
+    _ATTR_INDEX.clear()
+
+
+@bpy.app.handlers.persistent
+def _clear_attr_index(scene, depsgraph) -> None:
+    """Invalidate the attribute index whenever objects were added, removed or changed."""
+    if depsgraph.id_type_updated("OBJECT"):
+        _ATTR_INDEX.clear()
+
+
+if _clear_attr_index.__name__ not in {
+    handler.__name__ for handler in bpy.app.handlers.depsgraph_update_post
+}:
+    bpy.app.handlers.depsgraph_update_post.append(_clear_attr_index)
+
+
+def _index_attribute(filter_attribute: str) -> Dict[Hashable, List[str]]:
+    """Scan all objects once and map each value of an attribute to object names.
+
+    Args:
+        filter_attribute (str): Name of the custom attribute to index.
+
+    Returns:
+        dict: Mapping of attribute values to object names.
+    """
+    index = {}
+    for obj in bpy.data.objects:
+        value = obj.get(filter_attribute)
+        if isinstance(value, Hashable):
+            index.setdefault(value, []).append(obj.name)
+    _ATTR_INDEX[filter_attribute] = (len(bpy.data.objects), index)
+    return index
+
+
 def filter_objects(filter_attribute: str, filter_value: str) -> list[bpy.types.Object]:
     """Filter objects based on a custom attribute.
 
+    Lookups are served from a lazily built inverted index. Object names are
+    stored instead of object references to avoid stale pointers. The index
+    is rebuilt if it is missing the value, if a cached entry is outdated or
+    if objects were added or removed since it was built. Unhashable values
+    are matched with a linear scan.
+
     Args:
         filter_attribute (str): Name of the custom attribute to filter by.
         filter_value (str): Value of the custom attribute to filter by.
@@ -219,11 +316,25 @@ def filter_objects(filter_attribute: str, filter_value: str) -> list[bpy.types.O
     Returns:
         list: List of objects matching the filter.
     """
-    filtered_objs = []
-    for obj in bpy.data.objects:
-        if obj.get(filter_attribute) == filter_value:
-            filtered_objs.append(obj)
-    return filtered_objs
+    if not isinstance(filter_value, Hashable):
+        return [
+            obj for obj in bpy.data.objects if obj.get(filter_attribute) == filter_value
+        ]
+    cached = _ATTR_INDEX.get(filter_attribute)
+    index = None
+    if cached is not None and cached[0] == len(bpy.data.objects):
+        index = cached[1]
+    if index is not None and filter_value in index:
+        filtered_objs = [
+            bpy.data.objects.get(name) for name in index[filter_value]
+        ]
+        if all(
+            obj is not None and obj.get(filter_attribute) == filter_value
+            for obj in filtered_objs
+        ):
+            return filtered_objs
+    index = _index_attribute(filter_attribute)
+    return [bpy.data.objects[name] for name in index.get(filter_value, ())]
 
 
 def load_img_as_array(path: str) -> np.ndarray:
@@ -265,6 +376,9 @@ def load_image(path: str) -> bpy.types.Image:
 class ObjPointer(object):
     """Class to store pointers of blender objects. This prevents reference issues."""
 
+    # Mapping of object UUIDs to object names for constant time lookups
+    _index: Dict[str, str] = {}
+
     def __init__(self, obj: bpy.types.Object):
         """Create a pointer to a blender object.
 
@@ -300,9 +414,12 @@ class ObjPointer(object):
         """
         if self.type == "OBJECT":
             if "UUID" in obj:
-                return obj["UUID"]
-            ob_id = str(uuid.uuid4())
-            obj["UUID"] = ob_id
+                ob_id = obj["UUID"]
+            else:
+                ob_id = str(uuid.uuid4())
+                obj["UUID"] = ob_id
+                invalidate_attr_index()
+            ObjPointer._index[ob_id] = obj.name
         elif self.type == "COLLECTION":
             ob_id = obj.name
         return ob_id
@@ -317,13 +434,20 @@ class ObjPointer(object):
             ValueError: If object with uuid is not found.
         """
         if self.type == "OBJECT":
+            name = ObjPointer._index.get(self.uuid)
+            if name is not None:
+                obj = bpy.data.objects.get(name)
+                if obj is not None and obj.get("UUID") == self.uuid:
+                    return obj
+            # Fall back to a full scan, e.g. if the object was renamed
             for obj in bpy.data.objects:
                 if obj.get("UUID") == self.uuid:
+                    ObjPointer._index[self.uuid] = obj.name
                     return obj
         elif self.type == "COLLECTION":
-            for collection in bpy.data.collections:
-                if collection.name == self.uuid:
-                    return collection
+            collection = bpy.data.collections.get(self.uuid)
+            if collection is not None:
+                return collection
         err_msg = "Object with UUID {0} not found".format(self.uuid)
         logging.error(err_msg)
         raise ValueError(err_msg)
@@ -350,10 +474,24 @@ class RevertAfter(object):
             bpy.ops.ed.undo()
 
 
+def _get_bounding_boxes(objs):
+    # Extents of the local bounding boxes of all objects as (N, 3) array
+    extents = np.empty((len(objs), 3))
+    for i, obj in enumerate(objs):
+        num_verts = len(obj.data.vertices) if obj.type == "MESH" else 0
+        if num_verts and not obj.modifiers:
+            coords = np.empty(num_verts * 3, dtype=np.float32)
+            obj.data.vertices.foreach_get("co", coords)
+            coords = coords.reshape(-1, 3)
+            extents[i] = coords.max(axis=0) - coords.min(axis=0)
+        else:
+            # Blender's bounding box also covers geometry generated by modifiers
+            extents[i] = np.subtract(obj.bound_box[6], obj.bound_box[0])
+    return extents
+
+
 def _get_bounding_box(tmp_obj):
-    min_x, min_y, min_z = tmp_obj.bound_box[0]
-    max_x, max_y, max_z = tmp_obj.bound_box[6]
-    return max_x - min_x, max_y - min_y, max_z - min_z
+    return tuple(_get_bounding_boxes([tmp_obj])[0])
 
 
 def _scale_obj(tmp_obj, width, height, depth):
@@ -390,10 +528,30 @@ def _extract_bm(tmp_obj):
     # Cleanup
     if not isinstance(tmp_obj.data, bmesh.types.BMesh):
         bm.free()
+    tmp_mesh = tmp_obj.data
     bpy.data.objects.remove(tmp_obj, do_unlink=True)
+    # Free the duplicated mesh as well instead of leaving it as orphan data
+    if isinstance(tmp_mesh, bpy.types.Mesh) and tmp_mesh.users == 0:
+        bpy.data.meshes.remove(tmp_mesh)
     return vertices, faces
 
 
+def _fill_triangle_mesh(mesh, vertices, faces):
+    # Bulk copy vertex and triangle arrays instead of from_pydata's per element loop
+    vertices = np.ascontiguousarray(vertices, dtype=np.float32)
+    faces = np.ascontiguousarray(faces, dtype=np.int32)
+    num_faces = len(faces)
+    mesh.vertices.add(len(vertices))
+    mesh.loops.add(faces.size)
+    mesh.polygons.add(num_faces)
+    mesh.vertices.foreach_set("co", vertices.ravel())
+    mesh.loops.foreach_set("vertex_index", faces.ravel())
+    mesh.polygons.foreach_set(
+        "loop_start", np.arange(0, faces.size, 3, dtype=np.int32)
+    )
+    mesh.polygons.foreach_set("loop_total", np.full(num_faces, 3, dtype=np.int32))
+
+
 def convex_decomposition(
     obj_pointer: ObjPointer,
     conv_hull_collection_pointer: ObjPointer,
@@ -434,10 +592,10 @@ def convex_decomposition(
         conv_hull_collection_pointer.get().objects.link(convex_obj)
 
         # Create the mesh data
-        mesh.from_pydata(convex_hull[0], [], convex_hull[1])
+        _fill_triangle_mesh(mesh, convex_hull[0], convex_hull[1])
 
         # Update the mesh and object
-        mesh.update()
+        mesh.update(calc_edges=True)
         convex_obj.select_set(True)
         bpy.context.view_layer.objects.active = convex_obj
         convex_obj.select_set(False)
@@ -447,6 +605,7 @@ def convex_decomposition(
         apply_transform(convex_obj, use_scale=True)
         convex_obj.location += obj.location
         convex_obj["PARENT_UUID"] = obj_pointer.uuid
+        invalidate_attr_index()
         convex_obj.scale = obj.scale
         convex_hulls.append(convex_obj)
 
@@ -456,10 +615,14 @@ def convex_decomposition(
 class DisjointSet:
     def __init__(self):
         self.parent = {}
+        # Cluster of every item, rebuilt lazily after the forest changed
+        self._cluster_of = {}
+        self._cache_dirty = True
 
     def find(self, item):
         if item not in self.parent:
             self.parent[item] = item
+            self._cache_dirty = True
         if self.parent[item] != item:
             self.parent[item] = self.find(self.parent[item])
         return self.parent[item]
@@ -469,6 +632,7 @@ class DisjointSet:
         root2 = self.find(item2)
         if root1 != root2:
             self.parent[root1] = root2
+            self._cache_dirty = True
 
     def get_clusters(self):
         clusters = {}
@@ -479,16 +643,21 @@ class DisjointSet:
             clusters[root].add(item)
         return list(clusters.values())
 
+    def _build_cache(self):
+        self._cluster_of = {}
+        for cluster in self.get_clusters():
+            cluster = frozenset(cluster)
+            for item in cluster:
+                self._cluster_of[item] = cluster
+        self._cache_dirty = False
+
     def find_cluster(self, item):
         if item not in self.parent:
             return None  # Item not present in any cluster
 
-        root = self.find(item)
-        cluster = set()
-        for key in self.parent:
-            if self.find(key) == root:
-                cluster.add(key)
-        return cluster
+        if self._cache_dirty:
+            self._build_cache()
+        return self._cluster_of[item]
 
 
 def run_coacd(quality: float, coacd_mesh: coacd.Mesh) -> list:
@@ -528,15 +697,15 @@ def resize_textures(obj: bpy.types.Object, max_size: int):
         for node in mat.node_tree.nodes
         if node.type == "TEX_IMAGE"
     ]
-    for node in texture_nodes:
-        if node.image:
-            longest_side = max(node.image.size[0], node.image.size[1])
-            if longest_side > max_size:
-                scale_factor = max_size / longest_side
-                width = int(node.image.size[0] * scale_factor)
-                height = int(node.image.size[1] * scale_factor)
-                node.image.scale(width, height)
-                node.image.update()
+    # Nodes often share the same image, so only resize each image once
+    images = {node.image for node in texture_nodes if node.image}
+    for image in images:
+        width, height = image.size
+        longest_side = max(width, height)
+        if longest_side > max_size:
+            scale_factor = max_size / longest_side
+            image.scale(int(width * scale_factor), int(height * scale_factor))
+            image.update()
 
 
 def decimate_mesh(obj: bpy.types.Object, percent: float):
@@ -575,7 +744,7 @@ def duplicate_object(
 
     Args:
         obj (bpy.types.Object): Object to duplicate.
-        obj_data (bool, optional): Whether to duplicate the object data. Defaults to True.
+        obj_data (bool, optional): Whether to duplicate the object data. If False, the duplicate shares the data of the original. Defaults to True.
         actions (bool, optional): Whether to duplicate the actions. Defaults to True.
         collection (bpy.types.Collection, optional): Collection to link the duplicate to. Defaults to None.
 
@@ -700,17 +869,28 @@ def add_volume_attribute(obj: bpy.types.Object):
 
 
 def refresh_modifiers():
-    """Flip the visibility of all modifiers to refresh them."""
+    """Flip the visibility of all modifiers to refresh them.
+
+    All modifiers are flipped together so that the view layer is only updated
+    twice instead of once or twice per modifier.
+    """
+    visible_mods = []
+    hidden_mods = []
     for obj in bpy.data.objects:
         for mod in obj.modifiers:
             if mod.show_viewport:
-                mod.show_viewport = False
-                bpy.context.view_layer.update()
-                mod.show_viewport = True
-                bpy.context.view_layer.update()
+                visible_mods.append(mod)
             elif render_visibility(obj):
-                mod.show_viewport = True
-                bpy.context.view_layer.update()
+                hidden_mods.append(mod)
+
+    for mod in visible_mods:
+        mod.show_viewport = False
+    if visible_mods:
+        bpy.context.view_layer.update()
+    for mod in visible_mods + hidden_mods:
+        mod.show_viewport = True
+    if visible_mods or hidden_mods:
+        bpy.context.view_layer.update()
 
 
 def _get_num_clumps(num_objects: int, ratio: float) -> int:
@@ -722,21 +902,29 @@ def _get_instance_indices(obj_count: int, mean: int, std_dev: int) -> list:
     return np.random.choice(obj_count, num_objs_in_instance)
 
 
-def random_transform_object(
-    obj: bpy.types.Object, pos_std: float, scale_std: float
+def random_transform_objects(
+    objs: List[bpy.types.Object], pos_std: float, scale_std: float
 ) -> None:
-    """Randomly transform object.
+    """Randomly transform objects.
+
+    The random values for all objects are drawn in one batch per parameter.
 
     Args:
-        obj (bpy.types.Object): Object to transform.
+        objs (List[bpy.types.Object]): Objects to transform.
         pos_std (float): Standard deviation of position.
         scale_std (float): Standard deviation of scale.
     """
-    obj.location[0] = np.random.normal(0, pos_std)
-    obj.location[1] = np.random.normal(0, pos_std)
-    obj.rotation_euler[2] = np.random.uniform(0, 2 * np.pi)
-    scale_factor = np.random.normal(1, scale_std)
-    obj.scale = [scale_factor, scale_factor, scale_factor]
+    num_objs = len(objs)
+    locations = np.random.normal(0, pos_std, size=(num_objs, 2))
+    rotations = np.random.uniform(0, 2 * np.pi, size=num_objs)
+    scale_factors = np.random.normal(1, scale_std, size=num_objs)
+    for obj, location, rotation, scale_factor in zip(
+        objs, locations, rotations, scale_factors
+    ):
+        obj.location[0] = location[0]
+        obj.location[1] = location[1]
+        obj.rotation_euler[2] = rotation
+        obj.scale = [scale_factor, scale_factor, scale_factor]
 
 
 def apply_transformations(clump_obj) -> None:
@@ -771,19 +959,23 @@ def create_clumps(collection: bpy.types.Collection, config: dict) -> list:
         )
         instance_objects.append([all_objects[idx] for idx in indices])
 
+    position_std = config["position_std"]
+    scale_std = config["scale_std"]
+
     # Process each instance
     for instance in instance_objects:
         clump_items = []
         for obj in instance:
             clump_item = obj.copy()
 
-            clump_item.data = obj.data.copy()
-            random_transform_object(
-                clump_item, config["position_std"], config["scale_std"]
-            )
+            # Only the merge target needs its own mesh, the other items share
+            # the source mesh, which is copied into the target when merging.
+            if not clump_items:
+                clump_item.data = obj.data.copy()
             collection.objects.link(clump_item)
             clump_item.hide_set(True)
             clump_items.append(clump_item)
+        random_transform_objects(clump_items, position_std, scale_std)
 
         clump = merge_objects(clump_items)
         new_clumps.append(clump)
@@ -792,21 +984,57 @@ def create_clumps(collection: bpy.types.Collection, config: dict) -> list:
     return new_clumps
 
 
+def _material_index_map(target_materials, materials) -> list:
+    # Map material indices of a mesh to the target mesh, adding missing materials
+    index_map = []
+    for material in materials:
+        target_list = list(target_materials)
+        if material not in target_list:
+            target_materials.append(material)
+            target_list.append(material)
+        index_map.append(target_list.index(material))
+    return index_map
+
+
 def merge_objects(obj_list: list) -> bpy.types.Object:
     """Merge objects into single object.
 
+    The geometry of all objects is accumulated in a single BMesh and written
+    to the mesh of the first object once. The other objects are removed.
+
     Args:
         obj_list (list): List of objects to merge
 
     Returns:
         bpy.types.Object: Merged object
     """
-    with bpy.context.temp_override(
-        active_object=obj_list[0],
-        selected_objects=obj_list,
-    ):
-        bpy.ops.object.join()
-    return obj_list[0]
+    target_obj = obj_list[0]
+    # Make sure the world matrices include the latest transformations
+    bpy.context.view_layer.update()
+    target_inv = target_obj.matrix_world.inverted()
+    target_materials = target_obj.data.materials
+
+    bm = bmesh.new()
+    bm.from_mesh(target_obj.data)
+    for obj in obj_list[1:]:
+        num_verts, num_faces = len(bm.verts), len(bm.faces)
+        bm.from_mesh(obj.data)
+        # Move the appended vertices into the local space of the target
+        bmesh.ops.transform(
+            bm, matrix=target_inv @ obj.matrix_world, verts=bm.verts[num_verts:]
+        )
+        index_map = _material_index_map(target_materials, obj.data.materials)
+        if index_map != list(range(len(index_map))):
+            max_index = len(index_map) - 1
+            for face in bm.faces[num_faces:]:
+                face.material_index = index_map[min(face.material_index, max_index)]
+    bm.to_mesh(target_obj.data)
+    bm.free()
+    target_obj.data.update()
+
+    for obj in obj_list[1:]:
+        bpy.data.objects.remove(obj, do_unlink=True)
+    return target_obj
 
 
 def eval_param(eval_params: Union[float, dict, str]) -> Union[float, list, str]:
@@ -821,9 +1049,12 @@ def eval_param(eval_params: Union[float, dict, str]) -> Union[float, list, str]:
     is_list = isinstance(eval_params, list) or hasattr(eval_params, "to_list")
     eval_params = eval_params if is_list else [eval_params]
 
+    # Constant parameters need no sampling, so the frame and catalog are not needed
+    if all(isinstance(param, (numbers.Number, str)) for param in eval_params):
+        return list(eval_params) if is_list else eval_params[0]
+
     curr_frame = bpy.context.scene.frame_current
-    catalog_string = bpy.data.scenes["Scene"]["catalog"]
-    catalog = pickle.loads(bytes(catalog_string, "latin1"))
+    catalog = _load_scene_prop("catalog")
 
     evaluated_param = list(
         map(lambda x: su.apply_sampling(x, curr_frame, catalog), eval_params)
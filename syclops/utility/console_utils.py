@@ -1,26 +1,124 @@
+import codecs
 import os
 import threading
 import time
+from collections import deque
 from pathlib import Path
 
-import ruamel.yaml as yaml
-from filelock import FileLock
 from rich.console import Console, Group
 from rich.live import Live
 from rich.panel import Panel
 from rich.progress import MofNCompleteColumn, Progress
 from rich.status import Status
 
+from .general_utils import load_yaml, scan_tree
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:  # inotify is only available on Linux
+    INotify = None
+
+METADATA_SUFFIX = "metadata.yaml"
+
+
+class LogTail:
+    """Follow a growing log file, reading only the newly appended data."""
+
+    def __init__(self, path, max_lines=3):
+        self.path = path
+        self.max_lines = max_lines
+        self._lock = threading.Lock()
+        self._file = None
+        self._reset()
+
+    def _reset(self):
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._lines = deque(maxlen=self.max_lines)
+        self._partial = ""
+        self._errors = []
+
+    def _replaced(self):
+        """Check if the file was removed, replaced or truncated."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return True
+        return (
+            stat.st_ino != os.fstat(self._file.fileno()).st_ino
+            or stat.st_size < self._file.tell()
+        )
+
+    def _read(self):
+        """Read the appended data. Returns False if the file does not exist."""
+        if self._file is not None and self._replaced():
+            self.close()
+        if self._file is None:
+            try:
+                self._file = open(self.path, "rb")
+            except FileNotFoundError:
+                return False
+            self._reset()
+        lines = (self._partial + self._decoder.decode(self._file.read())).split("\n")
+        # The last element is an incomplete line or empty
+        self._partial = lines.pop()
+        for line in lines:
+            line = line.rstrip("\r") + "\n"
+            if self._errors or line.lower().startswith("error"):
+                self._errors.append(line)
+            self._lines.append(line)
+        return True
+
+    def tail(self):
+        """Return the last lines of the file or None if it does not exist.
+
+        Like readlines(), the last line might be incomplete.
+        """
+        with self._lock:
+            if not self._read():
+                return None
+            lines = list(self._lines)
+            if self._partial:
+                lines.append(self._partial)
+            return lines[-self.max_lines :]
+
+    def errors(self):
+        """Return all lines after the first line starting with "error"."""
+        with self._lock:
+            self._read()
+            errors = list(self._errors)
+            if self._partial and (errors or self._partial.lower().startswith("error")):
+                errors.append(self._partial)
+            return errors
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
 
 class ProgressTracker:
     def __init__(self, folder):
         self.folder = folder
         self.output_dicts = {}
+        # Parsed metadata files: {path: (mtime_ns, size, content)}
+        self._meta_cache = {}
+        # Progress bar of each output: {(sensor, type): [progress, task_id, completed]}
+        self._task_index = {}
+        # Outputs whose progress bar is complete
+        self._done = set()
         self.color_index = 0
         self.colors = ["[yellow]", "[red]", "[green]", "[magenta]", "[cyan]", "[blue]"]
 
     def __enter__(self):
         self.running = True
+        # Without inotify the folder is walked on every scan
+        self._inotify = INotify() if INotify is not None else None
+        self._watches = {}
+        self._dirty_files = set()
+        self._seeded = False
+        # Keep the log files open and only read what was appended
+        self._blender_log = LogTail(Path(self.folder) / "blender.log", max_lines=1)
+        self._logs = LogTail(Path(self.folder) / "logs.log", max_lines=3)
         self.thread = threading.Thread(target=self.scan)
         self.thread.start()
         return self
@@ -28,6 +126,8 @@ class ProgressTracker:
     def __exit__(self, exc_type, exc_value, traceback):
         self.running = False
         self.thread.join()
+        if self._inotify is not None:
+            self._inotify.close()
 
         errors = self.check_errors()
         if errors:
@@ -37,17 +137,70 @@ class ProgressTracker:
             for error in errors:
                 errors_string += error
             console.print(Panel(errors_string, title="[red bold] ERRORS"))
+        self._blender_log.close()
+        self._logs.close()
 
     def check_errors(self):
         # Check for errors in the logs and return all lines after the first "error"
-        try:
-            with open(Path(self.folder) / "blender.log", "r") as logs_file:
-                lines = logs_file.readlines()
-            for i, line in enumerate(lines):
-                if line.lower().startswith("error"):
-                    return lines[i:]
-        except (FileNotFoundError, IndexError):
-            pass
+        errors = self._blender_log.errors()
+        if errors:
+            return errors
+
+    def _watch_tree(self, folder):
+        """Watch a folder and its subfolders and return the metadata files in them."""
+        metadata_files = []
+        # Watch each folder before listing it, so entries created in between
+        # are reported by an event. Removed folders raise OSError and are skipped.
+        add_watch = self._add_watch if self._inotify is not None else None
+        for _, files in scan_tree(folder, METADATA_SUFFIX, on_folder=add_watch):
+            metadata_files.extend(entry.path for entry in files)
+        return metadata_files
+
+    def _add_watch(self, folder):
+        """Watch a folder for new subfolders and written files."""
+        watch = self._inotify.add_watch(
+            folder, flags.CLOSE_WRITE | flags.CREATE | flags.MOVED_TO
+        )
+        self._watches[watch] = folder
+
+    def _changed_metadata_files(self):
+        """Return the metadata files that may have changed since the last call."""
+        if self._inotify is None or not self._seeded:
+            self._seeded = True
+            return self._watch_tree(self.folder)
+        changed_files, self._dirty_files = self._dirty_files, set()
+        return changed_files
+
+    def _handle_event(self, event):
+        """Record the metadata files and folders reported by an inotify event."""
+        if event.mask & flags.Q_OVERFLOW:
+            # Events were lost, walk the whole folder again
+            self._seeded = False
+            return
+        if event.mask & flags.IGNORED:
+            self._watches.pop(event.wd, None)
+            return
+        folder = self._watches.get(event.wd)
+        if folder is None or not event.name:
+            return
+        path = os.path.join(folder, event.name)
+        if event.mask & flags.ISDIR:
+            # Files may have been created before the new folder was watched
+            self._dirty_files.update(self._watch_tree(path))
+        elif event.name.endswith(METADATA_SUFFIX):
+            self._dirty_files.add(path)
+
+    def _wait(self, timeout):
+        """Wait for timeout seconds while collecting file system events."""
+        if self._inotify is None:
+            time.sleep(timeout)
+            return
+        deadline = time.monotonic() + timeout
+        remaining = timeout
+        while remaining > 0:
+            for event in self._inotify.read(timeout=max(1, int(remaining * 1000))):
+                self._handle_event(event)
+            remaining = deadline - time.monotonic()
 
     def scan(self):
         console = Console()
@@ -57,20 +210,14 @@ class ProgressTracker:
         with Live(Panel(Group(main_status, Panel(log_status, title="LAST LOG")))) as lv:
             while self.running:
                 curr_blender_samples = ""
-                try:
-                    with open(Path(self.folder) / "blender.log", "r") as logs_file:
-                        lines = logs_file.readlines()
-
-                    if "ViewLayer | Sample " in lines[-1]:
-                        curr_blender_samples = (
-                            " [blue]Sample: " + lines[-1].split(" ")[-1][:-1]
-                        )
-                except (FileNotFoundError, IndexError):
-                    pass
+                lines = self._blender_log.tail()
+                if lines and "ViewLayer | Sample " in lines[-1]:
+                    curr_blender_samples = (
+                        " [blue]Sample: " + lines[-1].split(" ")[-1][:-1]
+                    )
                 # Read last line in logs file
-                try:
-                    with open(Path(self.folder) / "logs.log", "r") as logs_file:
-                        lines = logs_file.readlines()
+                lines = self._logs.tail()
+                if lines is not None:
                     # String of last 3 lines
                     try:
                         last_lines = "".join(lines[-3:])[:-1]
@@ -79,44 +226,67 @@ class ProgressTracker:
                         log_status.update(last_lines + curr_blender_samples)
                     except IndexError:
                         log_status.update(lines[-1][:-1] + curr_blender_samples)
-                except FileNotFoundError:
-                    pass
-                # Scan the folder and its subfolders
-                for root, dirs, files in os.walk(self.folder):
-                    metadata_files = [f for f in files if f.endswith("metadata.yaml")]
-                    for file in metadata_files:
-                        # Acquire a lock on the file
-                        lock = FileLock(os.path.join(root, file + ".lock"))
-                        with lock.acquire():
-                            # Read the contents of the output_meta.yaml file
-                            with open(os.path.join(root, file), "r") as f:
-                                self.output_dicts[root] = yaml.safe_load(f)
+                # Read new or changed metadata files
+                for file_path in self._changed_metadata_files():
+                    root = os.path.dirname(file_path)
+                    try:
+                        stat = os.stat(file_path)
+                    except FileNotFoundError:
+                        self._meta_cache.pop(file_path, None)
+                        continue
+                    # Only parse the file again if it changed since the last scan
+                    cached = self._meta_cache.get(file_path)
+                    if cached is None or cached[:2] != (
+                        stat.st_mtime_ns,
+                        stat.st_size,
+                    ):
+                        # Metadata files are replaced atomically, no lock is needed
+                        try:
+                            cached = (
+                                stat.st_mtime_ns,
+                                stat.st_size,
+                                load_yaml(file_path),
+                            )
+                        except FileNotFoundError:
+                            self._meta_cache.pop(file_path, None)
+                            continue
+                        self._meta_cache[file_path] = cached
+                    self.output_dicts[root] = cached[2]
                 for _, output_dict in self.output_dicts.items():
                     main_status.update("[bold white]Generating Data...")
                     # Check if the output_dict is valid
                     if output_dict is not None:
-                        expected_steps = output_dict["expected_steps"]
-                        len_generated_steps = len(output_dict["steps"])
                         sensor = output_dict["sensor"]
                         output_type = output_dict["type"]
+                        task_key = (sensor, output_type)
+                        if task_key in self._done:
+                            continue
+                        expected_steps = output_dict["expected_steps"]
+                        len_generated_steps = len(output_dict["steps"])
                         prog_dict = {"sensor": sensor, "type": output_type}
                         # Check if output is already a progress bar
                         if sensor in prog_bar_dict.keys():
-                            progress_bar_exists = False
-                            for progress_bar in prog_bar_dict[sensor].renderable.tasks:
-                                if progress_bar.fields["fields"] == prog_dict:
-                                    if progress_bar.completed < len_generated_steps:
-                                        prog_bar_dict[sensor].renderable.update(
-                                            progress_bar.id, advance=1
-                                        )
-                                    progress_bar_exists = True
-                            if not progress_bar_exists:
-                                prog_bar_dict[sensor].renderable.add_task(
+                            task = self._task_index.get(task_key)
+                            if task is not None:
+                                progress, task_id, completed = task
+                                if completed < len_generated_steps:
+                                    progress.update(task_id, advance=1)
+                                    task[2] = completed = completed + 1
+                                if completed >= expected_steps:
+                                    self._done.add(task_key)
+                            else:
+                                progress = prog_bar_dict[sensor].renderable
+                                task_id = progress.add_task(
                                     f"{self.colors[self.color_index]} {output_type}",
                                     completed=len_generated_steps,
                                     total=expected_steps,
                                     fields=prog_dict,
                                 )
+                                self._task_index[task_key] = [
+                                    progress,
+                                    task_id,
+                                    len_generated_steps,
+                                ]
                                 self.color_index = (self.color_index + 1) % len(
                                     self.colors
                                 )
@@ -141,7 +311,7 @@ class ProgressTracker:
                                     )
                                 )
                             )
-                time.sleep(1)
+                self._wait(1)
                 errors = self.check_errors()
                 if errors:
                     self.running = False
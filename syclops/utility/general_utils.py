@@ -1,27 +1,150 @@
 """Utility module for general functions."""
 
 import logging
+import os
+import time
+from contextlib import ExitStack, contextmanager
+from functools import lru_cache
+from importlib.metadata import distribution, entry_points
 from pathlib import Path
 from typing import List
-import pkg_resources
-from filelock import FileLock, Timeout
-from ruamel import yaml
+import yaml
 import importlib.util
-import hashlib
 import struct
+import numpy as np
+import xxhash
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Use the libyaml based C implementations if PyYAML was built with them
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+_YAML_DUMPER = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+
+def load_yaml(path: str):
+    """
+    Load a YAML file with the fastest available safe loader.
+
+    Args:
+        path: Path to the YAML file.
+
+    Returns:
+        The content of the YAML file.
+    """
+    with open(path, "r") as yaml_file:
+        return yaml.load(yaml_file, Loader=_YAML_LOADER)
+
+
+def dump_yaml(data, path: str) -> None:
+    """
+    Write data to a YAML file with the fastest available safe dumper.
+
+    The data is written to a temporary file that atomically replaces the
+    target, so readers without a lock never see a partially written file.
+
+    Args:
+        data: Data to write.
+        path: Path to the YAML file.
+    """
+    tmp_path = "{0}.tmp".format(path)
+    with open(tmp_path, "w") as yaml_file:
+        yaml.dump(data, yaml_file, Dumper=_YAML_DUMPER, sort_keys=False)
+    replace_file(tmp_path, path)
+
+
+def replace_file(src: str, dst: str, retries: int = 20, delay: float = 0.05) -> None:
+    """
+    Atomically replace a file with another one.
+
+    On Windows a file can not be replaced while it is opened by a reader,
+    so the replacement is retried a few times.
+
+    Args:
+        src: Path to the new file.
+        dst: Path to the file to replace.
+        retries: Number of retries if the file is in use.
+        delay: Delay between retries in seconds.
+    """
+    for _ in range(retries):
+        try:
+            os.replace(src, dst)
+            return
+        except PermissionError:
+            time.sleep(delay)
+    os.replace(src, dst)
+
+
+_PACK_VECTOR = struct.Struct('fff').pack
+_UNPACK_INT64 = struct.Struct('>q').unpack_from
+
 
 def hash_vector(vector):
     # Convert the 3D vector into bytes
-    packed_vector = struct.pack('fff', *vector)
+    packed_vector = _PACK_VECTOR(*vector)
+
+    # Non-cryptographic 64-bit hash, the vector is only used as a key.
+    # The big-endian digest is read as a signed 64-bit integer.
+    return _UNPACK_INT64(xxhash.xxh3_64_digest(packed_vector))[0]
+
+
+def hash_vectors(vectors) -> np.ndarray:
+    """
+    Hash an array of 3D vectors, matching hash_vector for every row.
 
-    # Use SHA-256 and truncate to 64 bits
-    hash_object = hashlib.sha256(packed_vector)
-    hash_digest = hash_object.digest()[:8]
+    Args:
+        vectors: Array-like of shape (N, 3).
 
-    # Convert the first 8 bytes of the hash to a 64-bit integer
-    hash_value = int.from_bytes(hash_digest, byteorder='big', signed=True)
+    Returns:
+        np.ndarray: Signed 64-bit hashes of shape (N,).
+    """
+    buffer = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, 3).tobytes()
+    digest = xxhash.xxh3_64_intdigest
+    hashes = np.fromiter(
+        (digest(buffer[i : i + 12]) for i in range(0, len(buffer), 12)),
+        dtype=np.uint64,
+        count=len(buffer) // 12,
+    )
+    return hashes.view(np.int64)
 
-    return hash_value
+
+def scan_tree(folder: str, suffix: str, on_folder=None):
+    """Walk a folder and its subfolders top-down using os.scandir.
+
+    Symlinked folders are not followed, like os.walk.
+
+    Args:
+        folder: Folder to walk.
+        suffix: Only files whose name ends with this suffix are returned.
+        on_folder: Optional callable called with the path of each folder before
+            it is listed. If it raises an OSError, the folder is skipped.
+
+    Yields:
+        tuple: Path of each folder and a list of its matching os.DirEntry files.
+    """
+    stack = [folder]
+    while stack:
+        path = stack.pop()
+        try:
+            if on_folder is not None:
+                on_folder(path)
+            entries = os.scandir(path)
+        except OSError:
+            # Folder was removed in the meantime
+            continue
+        subfolders = []
+        files = []
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    subfolders.append(entry.path)
+                elif entry.name.endswith(suffix) and entry.is_file():
+                    files.append(entry)
+        yield path, files
+        stack.extend(reversed(subfolders))
 
 
 def create_folder(path: str) -> None:
@@ -34,10 +157,70 @@ def create_folder(path: str) -> None:
     Path(path).mkdir(parents=True, exist_ok=True)
 
 
+def _try_lock(fd: int) -> bool:
+    """Try to acquire an exclusive lock on a file descriptor without blocking."""
+    if fcntl is not None:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        return True
+    os.lseek(fd, 0, os.SEEK_SET)
+    try:
+        msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+
+def _unlock(fd: int) -> None:
+    """Release the lock on a file descriptor."""
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def file_lock(path: str, timeout: float = 10, poll_interval: float = 0.01):
+    """
+    Hold an exclusive lock on a lock file.
+
+    Uses flock on POSIX and msvcrt.locking on Windows. The lock file is
+    created if needed and is not removed afterwards.
+
+    Args:
+        path: Path to the lock file.
+        timeout: Timeout for acquiring the lock in seconds.
+        poll_interval: Delay between attempts to acquire the lock.
+
+    Raises:
+        TimeoutError: If the lock could not be acquired.
+    """
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        deadline = time.monotonic() + timeout
+        while not _try_lock(fd):
+            if time.monotonic() >= deadline:
+                raise TimeoutError("Could not acquire lock on {0}.".format(path))
+            time.sleep(poll_interval)
+        try:
+            yield
+        finally:
+            _unlock(fd)
+    finally:
+        os.close(fd)
+
+
 class AtomicYAMLWriter(object):
     """
     Write YAML files atomically.
 
+    The lock only serializes writers. The file is replaced atomically, so
+    readers do not need to acquire the lock and see either the previous or
+    the new version of the file.
+
     Args:
         filename: Path to the YAML file.
         timeout: Timeout for acquiring the lock.
@@ -74,22 +257,26 @@ class AtomicYAMLWriter(object):
         Raises:
             TimeoutError: If the lock could not be acquired.
         """
-        self.lock = FileLock("{0}.lock".format(self.filename), timeout=10)
-
-        # Try to acquire lock
-        try:
-            self.lock.acquire()
-        except Timeout:
-            raise_str = "Could not acquire lock on {0}.".format(self.filename)
-            logging.error(raise_str)
-            raise TimeoutError(raise_str)
-
-        # Try to read the YAML file
-        try:
-            with open(self.filename, "r") as yaml_file:
-                self.data = yaml.safe_load(yaml_file)
-        except FileNotFoundError:
-            self.data = {}
+        # The stack releases the lock if reading the file fails
+        with ExitStack() as stack:
+            # Try to acquire lock
+            try:
+                stack.enter_context(
+                    file_lock("{0}.lock".format(self.filename), timeout=self.timeout)
+                )
+            except TimeoutError:
+                raise_str = "Could not acquire lock on {0}.".format(self.filename)
+                logging.error(raise_str)
+                raise TimeoutError(raise_str)
+
+            # Try to read the YAML file
+            try:
+                self.data = load_yaml(self.filename)
+            except FileNotFoundError:
+                self.data = {}
+
+            # Keep the lock until the context is exited
+            self._lock_stack = stack.pop_all()
 
         return self
 
@@ -101,9 +288,12 @@ class AtomicYAMLWriter(object):
             exc_value: The exception value.
             traceback: The traceback.
         """
-        with open(self.filename, "w") as yaml_file:
-            yaml.safe_dump(self.data, yaml_file)
-        self.lock.release()
+        try:
+            dump_yaml(self.data, self.filename)
+        except BaseException as error:
+            self._lock_stack.__exit__(type(error), error, error.__traceback__)
+            raise
+        self._lock_stack.__exit__(exc_type, exc_value, traceback)
 
 
 def find_class_id_mapping(job_config: dict) -> dict:
@@ -117,33 +307,49 @@ def find_class_id_mapping(job_config: dict) -> dict:
     """
     class_id_mapping = {}
 
-    def recursive_search(dictionary):
-        if isinstance(dictionary, dict):
-            if "class_id" in dictionary and "name" in dictionary:
-                class_id = dictionary["class_id"]
-                name = dictionary["name"]
+    # Depth-first traversal with an explicit stack. Children are pushed in
+    # reverse so that names are appended in the same order as a recursive walk.
+    stack = list(reversed(list(job_config.values())))
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            if "class_id" in node and "name" in node:
+                class_id = node["class_id"]
+                name = node["name"]
                 class_id_mapping.setdefault(class_id, []).append(name)
 
-                if "class_id_offset" in dictionary:
-                    for material_name, offset in dictionary["class_id_offset"].items():
+                if "class_id_offset" in node:
+                    for material_name, offset in node["class_id_offset"].items():
                         new_class_id = class_id + offset
                         material_key = f"{name}/{material_name}"
                         class_id_mapping.setdefault(new_class_id, []).append(
                             material_key,
                         )
-            for value in dictionary.values():
-                recursive_search(value)
-        elif isinstance(dictionary, list):
-            for element in dictionary:
-                recursive_search(element)
-
-    for element in job_config.values():
-        recursive_search(element)
+            stack.extend(reversed(list(node.values())))
+        elif isinstance(node, list):
+            stack.extend(reversed(node))
 
     return class_id_mapping
 
+@lru_cache(maxsize=None)
 def get_site_packages_path():
-    return pkg_resources.get_distribution("syclops").location
+    return str(distribution("syclops").locate_file(""))
+
+
+def iter_entry_points(group: str):
+    """Return the installed entry points of a group.
+
+    Args:
+        group: Name of the entry point group.
+
+    Returns:
+        Iterable of entry points.
+    """
+    eps = entry_points()
+    # Python < 3.10 returns a dict of groups
+    if hasattr(eps, "select"):
+        return eps.select(group=group)
+    return eps.get(group, [])
 
 def get_module_path(module_name: str) -> Path:
     spec = importlib.util.find_spec(module_name)
@@ -3,26 +3,38 @@ Script to be used inside of Blender to add keypoint information to 3d objects
 """
 
 import bpy
-import mathutils
+import numpy as np
 
 
-# Function to get relative position
-def get_relative_position(obj, target):
-    return target.matrix_world.inverted() @ obj.matrix_world.translation
+# Function to get the positions of objects relative to a target
+def get_relative_positions(objs, target):
+    if not objs:
+        return np.empty((0, 3))
+    # Invert the target matrix once and transform all positions together
+    world_positions = np.array(
+        [(*obj.matrix_world.translation, 1.0) for obj in objs]
+    )
+    inverse = np.array(target.matrix_world.inverted())
+    return (world_positions @ inverse.T)[:, :3]
 
 
 # Function to create empties at keypoint positions relative to the mesh object
 def create_empties_from_keypoints(mesh_object):
     keypoints = mesh_object["keypoints"]
-    for key, pos in keypoints.items():
-        # Calculate the world position from the relative position
-        world_position = mesh_object.matrix_world @ mathutils.Vector(
-            (pos["x"], pos["y"], pos["z"])
-        )
+    if not keypoints:
+        return
+    # Calculate all world positions from the relative positions at once
+    local_positions = np.array(
+        [(pos["x"], pos["y"], pos["z"], 1.0) for pos in keypoints.values()]
+    )
+    world_positions = local_positions @ np.array(mesh_object.matrix_world).T
+
+    collection = bpy.context.collection
+    for key, world_position in zip(keypoints.keys(), world_positions):
         # Create an empty and set its world position
-        bpy.ops.object.empty_add(location=world_position)
-        empty = bpy.context.active_object
-        empty.name = f"Keypoint_{key}"
+        empty = bpy.data.objects.new(f"Keypoint_{key}", None)
+        empty.location = world_position[:3]
+        collection.objects.link(empty)
 
 
 # Main script
@@ -34,16 +46,23 @@ if len(selected_objects) > 1 and active_object.type == "MESH":
     selected_objects.remove(active_object)
     selected_objects.sort(key=lambda x: x.name)
 
+    empties = [
+        (index, obj)
+        for index, obj in enumerate(selected_objects)
+        if obj.type == "EMPTY"
+    ]
+    relative_positions = get_relative_positions(
+        [obj for _, obj in empties], active_object
+    )
+
     keypoints = {}
 
-    for index, obj in enumerate(selected_objects):
-        if obj.type == "EMPTY":
-            relative_pos = get_relative_position(obj, active_object)
-            keypoints[str(index)] = {
-                "x": relative_pos.x,
-                "y": relative_pos.y,
-                "z": relative_pos.z,
-            }
+    for (index, _), relative_pos in zip(empties, relative_positions):
+        keypoints[str(index)] = {
+            "x": float(relative_pos[0]),
+            "y": float(relative_pos[1]),
+            "z": float(relative_pos[2]),
+        }
 
     if "keypoints" in active_object:
         del active_object["keypoints"]
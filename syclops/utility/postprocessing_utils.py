@@ -1,27 +1,30 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 
-import ruamel.yaml as yaml
-from filelock import FileLock, Timeout
-import pkg_resources
+from .general_utils import iter_entry_points, load_yaml, scan_tree
 
 
 def crawl_output_meta(parent_dir: str) -> dict:
-    "Craw through folders and subfolders to finde output_meta.yaml files."
+    """Craw through folders and subfolders to finde output_meta.yaml files.
+
+    The files are replaced atomically by their writers, so they are read
+    without a lock and may reflect any complete past version.
+    """
     output_meta_dict = {}
     # Scan the folder and its subfolders
-    try:
-        for root, dirs, files in os.walk(parent_dir):
-            if "output_meta.yaml" in files:
-                # Acquire a lock on the file
-                lock = FileLock(os.path.join(root, "output_meta.yaml.lock"))
-                with lock.acquire():
-                    # Read the contents of the output_meta.yaml file
-                    with open(os.path.join(root, "output_meta.yaml"), "r") as f:
-                        output_meta_dict[root] = yaml.safe_load(f)
-    except Timeout:
-        error_string = f"Could not acquire filelock for {os.path.join(root, 'output_meta.yaml.lock')}"
-        print(error_string)
-        raise TimeoutError(error_string)
+    roots = [
+        root
+        for root, files in scan_tree(parent_dir, "output_meta.yaml")
+        if any(entry.name == "output_meta.yaml" for entry in files)
+    ]
+    if not roots:
+        return output_meta_dict
+    # Read the files concurrently to overlap the file system latencies
+    with ThreadPoolExecutor(max_workers=min(32, len(roots))) as executor:
+        paths = [os.path.join(root, "output_meta.yaml") for root in roots]
+        for root, output_meta in zip(roots, executor.map(load_yaml, paths)):
+            output_meta_dict[root] = output_meta
     return output_meta_dict
 
 
@@ -50,9 +53,10 @@ def create_module_instances_pp(config: dict) -> list:
             instances.append(instance)
     return instances
 
+@lru_cache(maxsize=None)
 def _load_plugins_pp():
     plugins = {}
-    for entry_point in pkg_resources.iter_entry_points('syclops.postprocessing'):
+    for entry_point in iter_entry_points('syclops.postprocessing'):
         try:
             plugins[entry_point.name] = entry_point.load()
         except ModuleNotFoundError:
@@ -5,6 +5,7 @@ This module provides utility functions to sample parameters and assets in Blende
 """
 
 import fnmatch
+import functools
 import glob
 import logging
 import numbers
@@ -20,9 +21,10 @@ def sample_normal(config: tuple, *args) -> np.ndarray:
     Returns:
         np.ndarray: Sampled value.
     """
-    mean = np.array(config[0])
-    std = np.array(config[1])
-    return np.random.normal(mean, std)
+    mean, std = config[0], config[1]
+    if isinstance(mean, numbers.Number) and isinstance(std, numbers.Number):
+        return np.random.normal(mean, std)
+    return np.random.normal(np.array(mean), np.array(std))
 
 
 def sample_uniform(config: tuple, *args) -> np.ndarray:
@@ -34,9 +36,10 @@ def sample_uniform(config: tuple, *args) -> np.ndarray:
     Returns:
         np.ndarray: Sampled value.
     """
-    min_val = np.array(config[0])
-    max_val = np.array(config[1])
-    return np.random.uniform(min_val, max_val)
+    min_val, max_val = config[0], config[1]
+    if isinstance(min_val, numbers.Number) and isinstance(max_val, numbers.Number):
+        return np.random.uniform(min_val, max_val)
+    return np.random.uniform(np.array(min_val), np.array(max_val))
 
 
 def sample_step(
@@ -66,10 +69,10 @@ def sample_linear(
     Returns:
         Union[float, List]: Sampled value.
     """
-
-    start_val = np.array(config[0])
-    step_val = np.array(config[1])
-    return start_val + step_val * curr_frame
+    start_val, step_val = config[0], config[1]
+    if isinstance(start_val, numbers.Number) and isinstance(step_val, numbers.Number):
+        return start_val + step_val * curr_frame
+    return np.array(start_val) + np.array(step_val) * curr_frame
 
 
 def sample_random_selection(
@@ -86,6 +89,12 @@ def sample_random_selection(
     return config[np.random.randint(0, len(config))]
 
 
+@functools.lru_cache(maxsize=256)
+def _list_folder(path: str) -> tuple:
+    """List the files of an asset folder once per path."""
+    return tuple(glob.glob("{0}/*".format(path)))
+
+
 def sample_selection_folder(config: str, *args) -> str:
     """Randomly select a file from a given folder.
 
@@ -95,10 +104,39 @@ def sample_selection_folder(config: str, *args) -> str:
     Returns:
         str: Path to the selected file.
     """
-    files_in_folder = glob.glob("{0}/*".format(config))
+    files_in_folder = _list_folder(config)
     return files_in_folder[np.random.randint(0, len(files_in_folder))]
 
 
+# Filtered asset names: {(library id, filter, value): (library, size, names)}
+_ASSET_NAME_CACHE = {}
+
+
+def _filter_asset_names(library: dict, key: str, value: str) -> list:
+    """Return the asset names of a library matching a type or pattern.
+
+    Results are cached as long as the same, unchanged library is passed.
+
+    Args:
+        library: Assets of a catalog library.
+        key: Either "type" or "pattern".
+        value: Asset type or wildcard pattern.
+
+    Returns:
+        list: Matching asset names.
+    """
+    cache_key = (id(library), key, value)
+    cached = _ASSET_NAME_CACHE.get(cache_key)
+    if cached is not None and cached[0] is library and cached[1] == len(library):
+        return cached[2]
+    if key == "type":
+        names = [name for name, asset in library.items() if asset["type"] == value]
+    else:
+        names = fnmatch.filter(library, value)
+    _ASSET_NAME_CACHE[cache_key] = (library, len(library), names)
+    return names
+
+
 def sample_selection_asset(config: dict, *args, catalog) -> str:
     """Randomly select an asset from a given catalog.
 
@@ -110,9 +148,7 @@ def sample_selection_asset(config: dict, *args, catalog) -> str:
         str: Path to the selected asset.
     """
     library = catalog[config["library"]]["assets"]
-    asset_names = [
-        name for name, asset in library.items() if asset["type"] == config["type"]
-    ]
+    asset_names = _filter_asset_names(library, "type", config["type"])
     selected_asset = asset_names[np.random.randint(0, len(asset_names))]
     return "{0}/{1}".format(config["library"], selected_asset)
 
@@ -128,34 +164,123 @@ def sample_wildcard(config: dict, *args, catalog) -> str:
         str: Path to the selected asset.
     """
     library = catalog[config["library"]]["assets"]
-    asset_names = [name for name in library if fnmatch.fnmatch(name, config["pattern"])]
+    asset_names = _filter_asset_names(library, "pattern", config["pattern"])
     selected_asset = asset_names[np.random.randint(0, len(asset_names))]
     return "{0}/{1}".format(config["library"], selected_asset)
 
 
-def apply_sampling(parameter, curr_frame=None, catalog=None):
-    sample_functions = [
-        "normal",
-        "uniform",
-        "step",
-        "linear",
-        "random_selection",
-        "selection_folder",
-        "selection_asset",
-        "wildcard",
-    ]
+@functools.lru_cache(maxsize=None)
+def _get_interp_kernel():
+    """Compile the bilinear interpolation kernel if Numba is installed.
 
+    Returns:
+        The compiled kernel or None if Numba is not available.
+    """
+    try:
+        from numba import njit, prange
+    except ImportError:
+        return None
+
+    @njit(parallel=True, boundscheck=False, fastmath=True)
+    def interp_kernel(img, xs, ys, out):
+        height, width, channels = img.shape
+        for i in prange(xs.shape[0]):
+            x = min(max(xs[i], 0.0), width - 1.0)
+            y = min(max(ys[i], 0.0), height - 1.0)
+            x1 = int(x)
+            y1 = int(y)
+            x2 = min(x1 + 1, width - 1)
+            y2 = min(y1 + 1, height - 1)
+            wx = x - x1
+            wy = y - y1
+            for c in range(channels):
+                out[i, c] = (
+                    img[y1, x1, c] * (1 - wx) * (1 - wy)
+                    + img[y1, x2, c] * wx * (1 - wy)
+                    + img[y2, x1, c] * (1 - wx) * wy
+                    + img[y2, x2, c] * wx * wy
+                )
+
+    return interp_kernel
+
+
+def interpolate_img(img: np.ndarray, locations: np.ndarray) -> np.ndarray:
+    """Bilinearly interpolate an image at the given pixel locations.
+
+    Locations outside of the image are clamped to the image border. If Numba
+    is installed, a compiled kernel is used instead of the NumPy version.
+
+    Args:
+        img: Image of shape (height, width) or (height, width, channels).
+        locations: Array of shape (N, 2) containing x and y pixel coordinates.
+
+    Returns:
+        np.ndarray: Interpolated values of shape (N,) or (N, channels).
+    """
+    height, width = img.shape[:2]
+
+    interp_kernel = _get_interp_kernel()
+    if interp_kernel is not None:
+        img_channels = img.reshape(height, width, -1)
+        out = np.empty((len(locations), img_channels.shape[2]))
+        interp_kernel(
+            img_channels,
+            np.ascontiguousarray(locations[:, 0], dtype=np.float64),
+            np.ascontiguousarray(locations[:, 1], dtype=np.float64),
+            out,
+        )
+        return out if img.ndim == 3 else out[:, 0]
+
+    x = np.clip(locations[:, 0], 0, width - 1)
+    y = np.clip(locations[:, 1], 0, height - 1)
+    x1 = np.floor(x).astype(np.intp)
+    y1 = np.floor(y).astype(np.intp)
+    x2 = np.minimum(x1 + 1, width - 1)
+    y2 = np.minimum(y1 + 1, height - 1)
+    wx = x - x1
+    wy = y - y1
+
+    # Gather all four neighbours with a single take on the flattened image
+    flat_img = img.reshape(height * width, *img.shape[2:])
+    row1 = y1 * width
+    row2 = y2 * width
+    indices = np.stack([row1 + x1, row1 + x2, row2 + x1, row2 + x2])
+    corners = np.take(flat_img, indices, axis=0)
+
+    weights = np.empty((4, len(x)))
+    np.multiply(1 - wx, 1 - wy, out=weights[0])
+    np.multiply(wx, 1 - wy, out=weights[1])
+    np.multiply(1 - wx, wy, out=weights[2])
+    np.multiply(wx, wy, out=weights[3])
+    if img.ndim == 3:
+        weights = weights[..., np.newaxis]
+    return (corners * weights).sum(axis=0)
+
+
+# Sample functions in order of precedence
+_SAMPLE_FUNCTIONS = {
+    "normal": sample_normal,
+    "uniform": sample_uniform,
+    "step": sample_step,
+    "linear": sample_linear,
+    "random_selection": sample_random_selection,
+    "selection_folder": sample_selection_folder,
+}
+# Sample functions that additionally need the asset catalog
+_CATALOG_SAMPLE_FUNCTIONS = {
+    "selection_asset": sample_selection_asset,
+    "wildcard": sample_wildcard,
+}
+
+
+def apply_sampling(parameter, curr_frame=None, catalog=None):
     if isinstance(parameter, (numbers.Number, str)):
         return parameter
-    for sample_func in sample_functions:
-        if sample_func in parameter:
-            if sample_func in ["selection_asset", "wildcard"]:
-                return eval(f"sample_{sample_func}")(
-                    parameter[sample_func], curr_frame, catalog=catalog
-                )
-            else:
-                return eval(f"sample_{sample_func}")(
-                    parameter[sample_func], curr_frame
-                )
+    for name, sample_func in _SAMPLE_FUNCTIONS.items():
+        if name in parameter:
+            return sample_func(parameter[name], curr_frame)
+    for name, sample_func in _CATALOG_SAMPLE_FUNCTIONS.items():
+        if name in parameter:
+            return sample_func(parameter[name], curr_frame, catalog=catalog)
     logging.warning("Parameter {0} not supported format".format(parameter))
     raise ValueError("Parameter {0} not supported format".format(parameter))
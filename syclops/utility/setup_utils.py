@@ -1,30 +1,106 @@
+import copy
+import functools
+import hashlib
+import os
+import stat
 import sys
+import threading
 import zipfile
 import tarfile
 import platform
+import shutil
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 from pathlib import Path
+from typing import BinaryIO, Optional, Union
 from rich.progress import Progress
 import requests
+from requests.adapters import HTTPAdapter
 import appdirs
 from rich.console import Console
 from rich.prompt import Prompt
-from ruamel import yaml
 
+from .general_utils import dump_yaml, load_yaml
 
-def download_file(url: str, dest: Path) -> None:
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+# Number of zip members extracted per task
+ZIP_BATCH_SIZE = 100
+# Written into the Blender folder once the installation is complete
+INSTALL_MARKER = ".syclops_install_ok"
+
+# Archives are already compressed, request them as they are
+_DOWNLOAD_HEADERS = {"Accept-Encoding": "identity"}
+
+# Parsed config files: {path: (mtime_ns, size, config)}
+_CONFIG_CACHE = {}
+_CONFIG_CACHE_LOCK = threading.Lock()
+# Install folder resolved in this process
+_INSTALL_FOLDER = None
+
+
+class _ProgressReader:
     """
-    Download a file from the given URL to the specified destination with rich progress.
+    File-like wrapper that advances a progress bar by the number of bytes read.
+
+    If hash is True, the SHA-256 of the bytes is computed in the same pass
+    and available as the sha256 attribute.
     """
-    with requests.get(url, stream=True) as response:
+
+    def __init__(
+        self, fileobj: BinaryIO, progress: Progress, task, hash: bool = False
+    ) -> None:
+        self._fileobj = fileobj
+        self._progress = progress
+        self._task = task
+        self.sha256 = hashlib.sha256() if hash else None
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._fileobj.read(size)
+        if self.sha256 is not None:
+            self.sha256.update(data)
+        self._progress.update(self._task, advance=len(data))
+        return data
+
+
+@functools.lru_cache(maxsize=None)
+def _get_session() -> requests.Session:
+    """Create the HTTP session shared by all downloads on first use."""
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=4))
+    session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=4))
+    return session
+
+
+@contextmanager
+def stream_response(url: str):
+    """
+    Open a streaming download of the given URL with rich progress.
+
+    Yields:
+        A file-like object reading the response body. Its sha256 attribute
+        holds the hash of the bytes read so far.
+    """
+    with _get_session().get(url, stream=True, headers=_DOWNLOAD_HEADERS) as response:
         response.raise_for_status()
+        response.raw.decode_content = True
         total_length = int(response.headers.get("content-length", 0))
         task_description = f"[cyan]Downloading {url.split('/')[-1]}...[/cyan]"
         with Progress() as progress:
             task = progress.add_task(task_description, total=total_length)
-            with dest.open("wb") as file:
-                for chunk in response.iter_content(chunk_size=8192):
-                    file.write(chunk)
-                    progress.update(task, advance=len(chunk))
+            yield _ProgressReader(response.raw, progress, task, hash=True)
+
+
+def download_file(url: str, dest: Path) -> str:
+    """
+    Download a file from the given URL to the specified destination with rich progress.
+
+    Returns:
+        str: SHA-256 hex digest of the downloaded file.
+    """
+    with stream_response(url) as stream, dest.open("wb") as file:
+        # The stream advances the progress bar and the hash once per chunk
+        shutil.copyfileobj(stream, file, DOWNLOAD_CHUNK_SIZE)
+    return stream.sha256.hexdigest()
 
 
 def extract_zip(src: Path, dest: Path) -> None:
@@ -32,33 +108,82 @@ def extract_zip(src: Path, dest: Path) -> None:
     Extract a zip file with rich progress.
     """
     with zipfile.ZipFile(src, "r") as zip_ref:
-        total_files = len(zip_ref.namelist())
-        task_description = f"[red]Extracting {src.name}...[/red]"
-        with Progress() as progress:
-            task = progress.add_task(task_description, total=total_files)
-            for member in zip_ref.namelist():
-                zip_ref.extract(member, dest)
-                progress.update(task, advance=1)
+        members = zip_ref.infolist()
+    # Progress in compressed bytes, read from the central directory
+    total_size = sum(member.compress_size for member in members)
+    batches = [
+        members[i : i + ZIP_BATCH_SIZE] for i in range(0, len(members), ZIP_BATCH_SIZE)
+    ]
+
+    # ZipFile objects are not thread-safe, every worker opens its own
+    local = threading.local()
+    zip_refs = []
+    zip_refs_lock = threading.Lock()
+
+    def extract_batch(batch):
+        if not hasattr(local, "zip_ref"):
+            local.zip_ref = zipfile.ZipFile(src, "r")
+            with zip_refs_lock:
+                zip_refs.append(local.zip_ref)
+        for member in batch:
+            try:
+                local.zip_ref.extract(member, dest)
+            except FileExistsError:
+                # Another worker created the same parent folder concurrently
+                local.zip_ref.extract(member, dest)
+        return sum(member.compress_size for member in batch)
+
+    task_description = f"[red]Extracting {src.name}...[/red]"
+    try:
+        with Progress() as progress, ThreadPoolExecutor(
+            max_workers=os.cpu_count()
+        ) as executor:
+            task = progress.add_task(task_description, total=total_size)
+            futures = [executor.submit(extract_batch, batch) for batch in batches]
+            for future in as_completed(futures):
+                progress.update(task, advance=future.result())
+    finally:
+        for zip_ref in zip_refs:
+            zip_ref.close()
     # Rename folder
     extracted_folder = dest / src.stem
     extracted_folder.rename(dest / f"blender-{src.stem.split('-')[1]}")
 
 
-def extract_tar(src: Path, dest: Path) -> None:
+def extract_tar(
+    src: Union[Path, BinaryIO], dest: Path, archive_name: str = None
+) -> None:
     """
-    Extract a tar.xz file with rich progress.
+    Extract a tar.xz file or stream sequentially.
+
+    A file is extracted with rich progress. For a stream, e.g. from
+    stream_response, the progress is shown by the stream itself.
+
+    Args:
+        src: Path to the archive or a file-like object reading it.
+        dest: Destination folder.
+        archive_name: File name of the archive, required if src is a stream.
     """
-    with tarfile.open(src, "r:xz") as tar_ref:
-        total_files = len(tar_ref.getnames())
+    if isinstance(src, Path):
+        archive_name = src.name
         task_description = f"[red]Extracting {src.name}...[/red]"
-        with Progress() as progress:
-            task = progress.add_task(task_description, total=total_files)
-            for member in tar_ref:
-                tar_ref.extract(member, dest)
-                progress.update(task, advance=1)
+        with src.open("rb") as file, Progress() as progress:
+            task = progress.add_task(task_description, total=src.stat().st_size)
+            _extract_tar_stream(_ProgressReader(file, progress, task), dest)
+    else:
+        _extract_tar_stream(src, dest)
     # Rename folder
-    extracted_folder = dest / src.stem.split(".tar")[0]
-    extracted_folder.rename(dest / f"blender-{src.stem.split('-')[1]}")
+    extracted_folder = dest / archive_name.split(".tar")[0]
+    extracted_folder.rename(dest / f"blender-{archive_name.split('-')[1]}")
+
+
+def _extract_tar_stream(fileobj: BinaryIO, dest: Path) -> None:
+    # Stream mode reads the archive once, without seeking
+    with tarfile.open(
+        fileobj=fileobj, mode="r|xz", bufsize=DOWNLOAD_CHUNK_SIZE
+    ) as tar_ref:
+        for member in tar_ref:
+            tar_ref.extract(member, dest)
 
 
 def install_blender(version: str, install_dir: Path) -> None:
@@ -73,30 +198,54 @@ def install_blender(version: str, install_dir: Path) -> None:
     os_type = platform.system()
     if os_type == "Windows":
         file_name = f"blender-{version}-windows-x64.zip"
-        extract_func = extract_zip
     elif os_type == "Linux":
         file_name = f"blender-{version}-linux-x64.tar.xz"
-        extract_func = extract_tar
     else:
         print("Unsupported OS")
         sys.exit(1)
 
     download_path = f"{base_url}Blender{version_major}/{file_name}"
     dest_file = install_dir / file_name
+    blender_folder = install_dir / f"blender-{version}"
 
     # Check if Blender is already installed in the package directory
-    if (install_dir / f"blender-{version}").exists():
+    if (blender_folder / INSTALL_MARKER).exists():
         print(f"Blender {version} already installed.")
         return
+    if blender_folder.exists():
+        # Installations from before the marker was introduced have no marker
+        executable = "blender.exe" if os_type == "Windows" else "blender"
+        if (blender_folder / executable).is_file():
+            print(f"Blender {version} already installed.")
+            (blender_folder / INSTALL_MARKER).write_text("unknown\n")
+            return
+        # The folder of an aborted installation is incomplete
+        print(
+            f"Blender {version} installation in {blender_folder} is incomplete "
+            f"({executable} not found). Removing and reinstalling it."
+        )
+        shutil.rmtree(blender_folder)
+
+    if os_type == "Linux":
+        # Extract Blender while downloading, tar archives can be read sequentially
+        with stream_response(download_path) as stream:
+            extract_tar(stream, install_dir, archive_name=file_name)
+            # Read the padding after the archive end, so the hash covers the whole file
+            while stream.read(DOWNLOAD_CHUNK_SIZE):
+                pass
+        archive_hash = stream.sha256.hexdigest()
+    else:
+        # Download Blender
+        archive_hash = download_file(download_path, dest_file)
 
-    # Download Blender
-    download_file(download_path, dest_file)
+        # Extract Blender
+        extract_zip(dest_file, install_dir)
 
-    # Extract Blender
-    extract_func(dest_file, install_dir)
+        # Clean up
+        dest_file.unlink()
 
-    # Clean up
-    dest_file.unlink()
+    # Mark the installation as complete
+    (blender_folder / INSTALL_MARKER).write_text(archive_hash + "\n")
 
 
 def get_or_create_install_folder(install_folder_path: str = None) -> Path:
@@ -109,6 +258,10 @@ def get_or_create_install_folder(install_folder_path: str = None) -> Path:
     Returns:
         Path: The path to the install folder.
     """
+    global _INSTALL_FOLDER
+    if install_folder_path is None and _INSTALL_FOLDER is not None:
+        return _INSTALL_FOLDER
+
     config = _load_config()
     install_folder_key = "install_folder"
 
@@ -117,29 +270,48 @@ def get_or_create_install_folder(install_folder_path: str = None) -> Path:
             return Path(install_folder_path).resolve()
         return _ask_directory().resolve()
 
+    saved_mode = None
+    if install_folder_path is None and install_folder_key in config:
+        saved_mode = _stat_mode(config[install_folder_key])
+
     # If 'install_folder' is not in the config or the saved folder doesn't exist
-    if (
-        install_folder_key not in config
-        or not Path(config[install_folder_key]).exists()
-        or install_folder_path is not None
-    ):
+    if saved_mode is None:
         install_folder = determine_folder()
         config[install_folder_key] = str(install_folder)
         _write_config(config)
+        install_folder.mkdir(parents=True, exist_ok=True)
     else:
         install_folder = Path(config[install_folder_key]).resolve()
+        # Ensure the folder exists
+        if not stat.S_ISDIR(saved_mode):
+            install_folder.mkdir(parents=True, exist_ok=True)
 
-    # Ensure the folder exists
-    install_folder.mkdir(parents=True, exist_ok=True)
+    _INSTALL_FOLDER = install_folder
     return install_folder
 
 
+def _stat_mode(path: str) -> Optional[int]:
+    """Return the st_mode of a path or None if it does not exist."""
+    try:
+        return os.stat(path).st_mode
+    except FileNotFoundError:
+        return None
+
+
 def _load_config() -> dict:
     config_file = _get_or_create_config_file_path()
-    if config_file.exists():
-        with open(config_file, "r") as f:
-            return yaml.safe_load(f)
-    return {}
+    try:
+        config_stat = config_file.stat()
+    except FileNotFoundError:
+        return {}
+    with _CONFIG_CACHE_LOCK:
+        cached = _CONFIG_CACHE.get(config_file)
+        # Only parse the file again if it changed since the last read
+        if cached is None or cached[:2] != (config_stat.st_mtime_ns, config_stat.st_size):
+            cached = (config_stat.st_mtime_ns, config_stat.st_size, load_yaml(config_file))
+            _CONFIG_CACHE[config_file] = cached
+        # Callers modify the returned config
+        return copy.deepcopy(cached[2])
 
 
 def _get_or_create_config_file_path() -> Path:
@@ -152,8 +324,9 @@ def _write_config(config: dict):
     # Create the directory if it doesn't exist
     if not config_file.parent.exists():
         config_file.parent.mkdir(parents=True, exist_ok=True)
-    with open(config_file, "w") as f:
-        yaml.dump(config, f)
+    with _CONFIG_CACHE_LOCK:
+        dump_yaml(config, config_file)
+        _CONFIG_CACHE.pop(config_file, None)
 
 
 def _ask_directory() -> Path:
@@ -1,36 +1,79 @@
+import ast
+import functools
+import hashlib
 import json
+import multiprocessing
+import os
 import time
+from concurrent.futures import (FIRST_COMPLETED, ProcessPoolExecutor,
+                                ThreadPoolExecutor, wait)
 from pathlib import Path
 
 import cv2
 import numpy as np
-import yaml
 from syclops.preprocessing.texture_processor import process_texture
 
+from .general_utils import load_yaml
+
 
 def _load_yaml(path):
+    # The parsed files are cached, they must not be modified by the caller
+    path = str(path)
+    return _load_yaml_cached(path, os.stat(path).st_mtime_ns)
+
+
+@functools.lru_cache(maxsize=256)
+def _load_yaml_cached(path, mtime_ns):
+    return load_yaml(path)
+
+
+def _load_json(path):
+    # The parsed files are cached, they must not be modified by the caller
+    path = str(path)
+    return _load_json_cached(path, os.stat(path).st_mtime_ns)
+
+
+@functools.lru_cache(maxsize=256)
+def _load_json_cached(path, mtime_ns):
     with open(path, "r") as f:
-        return yaml.safe_load(f)
+        return json.load(f)
+
+
+@functools.lru_cache(maxsize=8)
+def _projection_matrix(camera_bytes: bytes, pose_bytes: bytes) -> np.ndarray:
+    # World to image projection, cached since cameras are often static
+    camera_matrix = np.frombuffer(camera_bytes).reshape(3, 3)
+    pose_matrix = np.frombuffer(pose_bytes).reshape(4, 4)
+    projection = camera_matrix @ np.linalg.inv(pose_matrix)[:3]
+    projection.flags.writeable = False
+    return projection
 
 
 def read_image(img_path, cmap=cv2.COLORMAP_JET):
     img = np.load(img_path)["array"]
-    img = ((img - img.min()) / (img.max() - img.min()) * 255).astype(np.uint8)
+    # OpenCV does not support 64-bit integers, e.g. hashed instance ids
+    if img.dtype in (np.int64, np.uint64):
+        img = img.astype(np.float64)
+    # Min-max scale to uint8 in a single pass
+    img = cv2.normalize(
+        img, None, alpha=0, beta=255, norm_type=cv2.NORM_MINMAX, dtype=cv2.CV_8U
+    )
     return cv2.applyColorMap(img, cmap)
 
 
 def read_and_draw_bounding_boxes(img, bb_path):
     with open(bb_path, "r") as f:
-        lines = f.readlines()
+        # Rows of class id, x center, y center, width and height
+        boxes = np.array(f.read().split(), dtype=np.float64).reshape(-1, 5)
 
     bb_img = img.copy()
-    for line in lines:
-        _, x_center, y_center, width, height = map(float, line.split())
-        x = int(x_center * img.shape[1] - width * img.shape[1] / 2)
-        y = int(y_center * img.shape[0] - height * img.shape[0] / 2)
-        w = int(width * img.shape[1])
-        h = int(height * img.shape[0])
-        cv2.rectangle(bb_img, (x, y), (x + w, y + h), (0, 255, 0), 1)
+    img_size = np.array([img.shape[1], img.shape[0]], dtype=np.float64)
+    centers = boxes[:, 1:3] * img_size
+    sizes = boxes[:, 3:5] * img_size
+    top_left = (centers - sizes / 2).astype(np.int32)
+    bottom_right = top_left + sizes.astype(np.int32)
+    for (x, y), (x2, y2) in zip(top_left.tolist(), bottom_right.tolist()):
+        cv2.rectangle(bb_img, (x, y), (x2, y2), (0, 255, 0), 1)
     return bb_img
 
 
@@ -78,113 +121,249 @@ def dataset_viewer(args):
     )
     image_paths = sorted(list(Path(camera_folder / "rect").iterdir()))
 
-    for i, image in enumerate(image_paths):
-        img = cv2.imread(str(image))
-        cv2.imshow("RGB", img)
+    def load_frame(i):
+        img = cv2.imread(str(image_paths[i]))
+        # Images to show by window name
+        frame = {"RGB": img}
 
         if annotation_data["semantic_segmentation"]:
-            cv2.imshow(
-                "Semantic", read_image(annotation_data["semantic_segmentation"][i])
+            frame["Semantic"] = read_image(
+                annotation_data["semantic_segmentation"][i]
             )
 
         if annotation_data["instance_segmentation"]:
             instance_img = read_image(annotation_data["instance_segmentation"][i])
-            cv2.imshow("Instance", instance_img)
+            frame["Instance"] = instance_img
 
         if annotation_data["depth"]:
-            cv2.imshow("Depth", read_image(annotation_data["depth"][i]))
+            frame["Depth"] = read_image(annotation_data["depth"][i])
 
         if annotation_data["object_volume"]:
-            cv2.imshow("Volume", read_image(annotation_data["object_volume"][i]))
+            frame["Volume"] = read_image(annotation_data["object_volume"][i])
 
         if annotation_data["bounding_box"]:
             bb_img = read_and_draw_bounding_boxes(
                 img, annotation_data["bounding_box"][i]
             )
-            cv2.imshow("Bounding Boxes", bb_img)
-        
+            frame["Bounding Boxes"] = bb_img
+
         if annotation_data["keypoints"]:
             keypoint_img = img.copy()
             with open(annotation_data["keypoints"][i], "r") as f:
                 keypoints = json.load(f)
-            for instance_id, keypoint_dict in keypoints.items():
-                for key, keypoint in keypoint_dict.items():
-                    if key == "class_id":
-                        continue
-                    else:
-                        cv2.circle(keypoint_img, (int(keypoint["x"]), int(keypoint["y"])), 4, (0, 0, 255), 1)
-            cv2.imshow("Keypoints", keypoint_img)
+            points = np.array(
+                [
+                    (keypoint["x"], keypoint["y"])
+                    for keypoint_dict in keypoints.values()
+                    for key, keypoint in keypoint_dict.items()
+                    if key != "class_id"
+                ],
+                dtype=np.float64,
+            ).reshape(-1, 2)
+            for x, y in points.astype(np.int32).tolist():
+                cv2.circle(keypoint_img, (x, y), 4, (0, 0, 255), 1)
+            frame["Keypoints"] = keypoint_img
 
         if camera_intrinsics and camera_extrinsics and object_positions:
             pos_img = img.copy()
             # Read camera intrinsics yaml
-            camera_matrix = np.array(_load_yaml(camera_intrinsics[i])["camera_matrix"])
+            camera_matrix = np.array(
+                _load_yaml(camera_intrinsics[i])["camera_matrix"], dtype=np.float64
+            )
             # Read camera extrinsics yaml
-            pose_matrix = np.array(_load_yaml(camera_extrinsics[i])["camera_pose"])
-            # Read object positions yaml
-            with open(object_positions[i], "r") as f:
-                # Import JSON as dict
-                object_positions_dict = json.load(f)
-            for _, poses in object_positions_dict.items():
-                location_list = [element["loc"] for element in poses]
+            pose_matrix = np.array(
+                _load_yaml(camera_extrinsics[i])["camera_pose"], dtype=np.float64
+            )
+            # Read object positions json
+            object_positions_dict = _load_json(object_positions[i])
+            if object_positions_dict:
+                location_list = [
+                    element["loc"]
+                    for poses in object_positions_dict.values()
+                    for element in poses
+                ]
                 positions_array = np.array(location_list, dtype=np.float32).reshape(
                     (-1, 3)
                 )
                 # Add 1 to position to get homogeneous coordinates
-                positions_array = np.concatenate(
-                    (positions_array, np.ones((positions_array.shape[0], 1))),
-                    axis=1,
-                    dtype=np.float32,
+                positions_array = np.hstack(
+                    (positions_array, np.ones((positions_array.shape[0], 1), dtype=np.float32))
+                )
+                # Projection from world to image coordinates
+                projection = _projection_matrix(
+                    camera_matrix.tobytes(), pose_matrix.tobytes()
                 )
-                # Transform to camera coordinates
-                positions_array = np.matmul(
-                    np.linalg.inv(pose_matrix), positions_array.T
-                ).T
-                # Transform to image coordinates
-                positions_array = np.matmul(camera_matrix, positions_array[:, :3].T).T
+                positions_array = positions_array @ projection.T
                 # Normalize
-                positions_array = positions_array / positions_array[:, 2:]
-                # Draw points
-                for position in positions_array:
-                    width, height = img.shape[1], img.shape[0]
-                    x, y = int(position[0]), int(position[1])
-                    if x >= 0 and x < width and y >= 0 and y < height:
-                        cv2.circle(pos_img, (int(x), int(y)), 4, (0, 0, 255), 1)
-                cv2.imshow("Object Positions", pos_img)
+                positions_array = positions_array[:, :2] / positions_array[:, 2:]
+                # Draw points inside of the image
+                pixels = positions_array.astype(np.int64)
+                width, height = img.shape[1], img.shape[0]
+                visible = (
+                    (pixels[:, 0] >= 0)
+                    & (pixels[:, 0] < width)
+                    & (pixels[:, 1] >= 0)
+                    & (pixels[:, 1] < height)
+                )
+                for x, y in pixels[visible].tolist():
+                    cv2.circle(pos_img, (x, y), 4, (0, 0, 255), 1)
+                frame["Object Positions"] = pos_img
+
+        return frame
 
-        cv2.waitKey(0)
+    # Load the next frame in the background while the current one is shown
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        next_frame = executor.submit(load_frame, 0) if image_paths else None
+        for i in range(len(image_paths)):
+            frame = next_frame.result()
+            if i + 1 < len(image_paths):
+                next_frame = executor.submit(load_frame, i + 1)
+            for window_name, window_img in frame.items():
+                cv2.imshow(window_name, window_img)
+            cv2.waitKey(0)
+
+
+def _texture_dependencies(texture_dict):
+    # Names of the textures used by the operations of a texture
+    dependencies = set()
+    for operation in texture_dict["ops"]:
+        for operation_name, operation_conf in operation.items():
+            if operation_name == "input_texture":
+                dependencies.add(operation_conf)
+            elif operation_name == "keep_overlapp":
+                dependencies.add(operation_conf["texture"])
+            elif operation_name == "math_expression":
+                # Textures are available as variables in the expression
+                try:
+                    tree = ast.parse(operation_conf, mode="eval")
+                except SyntaxError:
+                    # Fails the same way when the texture is generated
+                    continue
+                dependencies.update(
+                    node.id for node in ast.walk(tree) if isinstance(node, ast.Name)
+                )
+    return dependencies
+
+
+def _generate_texture(texture_name, texture_dict, textures):
+    # Worker processes are reused, so the random state might still be the one
+    # left by a seeded texture. Reseed to keep unseeded textures random.
+    if texture_dict["config"].get("seed") is None:
+        np.random.seed()
+    return process_texture(texture_name, texture_dict, textures, 1)
+
+
+def _generate_textures(texture_dicts, texture_keys, texture_cache, executor):
+    """Generate textures in parallel, each once the textures it uses are ready.
+
+    Textures are generated in separate processes, since process_texture
+    seeds and draws from the global NumPy random state.
+
+    Yields:
+        tuple: Name and texture, in order of completion.
+    """
+    textures = {}
+    pending = dict(texture_dicts)
+    running = {}
+    while pending or running:
+        scheduled = True
+        while scheduled:
+            scheduled = False
+            for texture_name, texture_dict in list(pending.items()):
+                dependencies = _texture_dependencies(texture_dict) & texture_dicts.keys()
+                if not dependencies <= textures.keys():
+                    continue
+                del pending[texture_name]
+                texture = texture_cache.get(texture_keys[texture_name])
+                if texture is not None:
+                    textures[texture_name] = texture
+                    scheduled = True
+                    yield texture_name, texture
+                else:
+                    future = executor.submit(
+                        _generate_texture,
+                        texture_name,
+                        texture_dict,
+                        {name: textures[name] for name in dependencies},
+                    )
+                    running[future] = texture_name
+        if not running:
+            if pending:
+                raise ValueError(
+                    "Circular texture dependencies: {0}".format(", ".join(pending))
+                )
+            break
+        done, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in done:
+            texture_name = running.pop(future)
+            textures[texture_name] = future.result()
+            yield texture_name, textures[texture_name]
 
 
 def texture_viewer(args):
     print("Starting Texture Viewer - Press Q to stop")
     job_filepath = Path(args.texture_viewer)
     view_active = True
+    last_stat = None
+    # Generated textures by the hash of their definition and all previous ones
+    texture_cache = {}
+    # Spawned workers do not inherit the state of the OpenCV windows
+    executor = ProcessPoolExecutor(
+        max_workers=min(8, os.cpu_count() or 1),
+        mp_context=multiprocessing.get_context("spawn"),
+    )
     # Continuously read the yaml file
-    while view_active:
-        try:
-            with open(job_filepath, "r") as f:
-                yaml_dict = yaml.safe_load(f)
-
-            if "textures" in yaml_dict:
-                textures = {}
-                for texture_name, texture_dict in yaml_dict["textures"].items():
-                    # Combine global texture seed with texture specific seed
-                    if (
-                        "seed" in texture_dict["config"]
-                        and "textures" in yaml_dict["seeds"]
-                    ):
-                        texture_dict["config"]["seed"] = (
-                            yaml_dict["seeds"]["textures"]
-                            + texture_dict["config"]["seed"]
-                        )
-
-                    texture = process_texture(texture_name, texture_dict, textures, 1)
-                    textures[texture_name] = texture
-                    cv2.imshow(texture_name, texture)
-                    if cv2.waitKey(1) == ord("q"):
+    with executor:
+        while view_active:
+            try:
+                stat = job_filepath.stat()
+                file_stat = (stat.st_mtime_ns, stat.st_size)
+                if file_stat == last_stat:
+                    # Nothing changed, only keep the windows responsive
+                    if cv2.waitKey(1000) == ord("q"):
                         view_active = False
-                        break
+                    continue
+                yaml_dict = load_yaml(job_filepath)
+
+                if "textures" in yaml_dict:
+                    texture_keys = {}
+                    texture_key = ""
+                    for texture_name, texture_dict in yaml_dict["textures"].items():
+                        # Combine global texture seed with texture specific seed
+                        if (
+                            "seed" in texture_dict["config"]
+                            and "textures" in yaml_dict["seeds"]
+                        ):
+                            texture_dict["config"]["seed"] = (
+                                yaml_dict["seeds"]["textures"]
+                                + texture_dict["config"]["seed"]
+                            )
+
+                        # Textures can depend on previous ones, so their key is chained
+                        texture_key = hashlib.sha1(
+                            (
+                                texture_key
+                                + json.dumps(
+                                    [texture_name, texture_dict],
+                                    sort_keys=True,
+                                    default=str,
+                                )
+                            ).encode()
+                        ).hexdigest()
+                        texture_keys[texture_name] = texture_key
+
+                    new_texture_cache = {}
+                    for texture_name, texture in _generate_textures(
+                        yaml_dict["textures"], texture_keys, texture_cache, executor
+                    ):
+                        new_texture_cache[texture_keys[texture_name]] = texture
+                        cv2.imshow(texture_name, texture)
+                        if cv2.waitKey(1) == ord("q"):
+                            view_active = False
+                            break
+                    texture_cache = new_texture_cache
+                    time.sleep(1)
+                last_stat = file_stat
+            except Exception as e:
+                print(e)
                 time.sleep(1)
-        except Exception as e:
-            print(e)
-            time.sleep(1)